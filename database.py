@@ -5,16 +5,21 @@ MongoDB helper functions ready to use in your backend code.
 Import and use these functions in your API endpoints for database operations.
 """
 
-from pymongo import MongoClient
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import BulkWriteError
 from datetime import datetime, timezone
 import os
+import asyncio
+import logging
 from dotenv import load_dotenv
-from typing import Union
+from typing import Iterable, Optional, Union
 from pydantic import BaseModel
 
 # Load environment variables from .env file
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 _client = None
 db = None
 
@@ -22,11 +27,11 @@ database_url = os.getenv("DATABASE_URL")
 database_name = os.getenv("DATABASE_NAME")
 
 if database_url and database_name:
-    _client = MongoClient(database_url)
+    _client = AsyncIOMotorClient(database_url, maxPoolSize=100)
     db = _client[database_name]
 
 # Helper functions for common database operations
-def create_document(collection_name: str, data: Union[BaseModel, dict]):
+async def create_document(collection_name: str, data: Union[BaseModel, dict]):
     """Insert a single document with timestamp"""
     if db is None:
         raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
@@ -40,10 +45,10 @@ def create_document(collection_name: str, data: Union[BaseModel, dict]):
     data_dict['created_at'] = datetime.now(timezone.utc)
     data_dict['updated_at'] = datetime.now(timezone.utc)
 
-    result = db[collection_name].insert_one(data_dict)
+    result = await db[collection_name].insert_one(data_dict)
     return str(result.inserted_id)
 
-def get_documents(collection_name: str, filter_dict: dict = None, limit: int = None):
+async def get_documents(collection_name: str, filter_dict: dict = None, limit: int = None):
     """Get documents from collection"""
     if db is None:
         raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
@@ -52,4 +57,128 @@ def get_documents(collection_name: str, filter_dict: dict = None, limit: int = N
     if limit:
         cursor = cursor.limit(limit)
     
-    return list(cursor)
+    return await cursor.to_list(length=None)
+
+async def get_recent_documents(collection_name: str, fields: Iterable[str], limit: int = None):
+    """Get the newest documents, projected to `fields` with `_id` as a string"""
+    if db is None:
+        raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+
+    pipeline = [{"$sort": {"_id": -1}}]
+    if limit:
+        pipeline.append({"$limit": limit})
+    projection = {field: 1 for field in fields}
+    projection["_id"] = {"$toString": "$_id"}
+    pipeline.append({"$project": projection})
+
+    return await db[collection_name].aggregate(pipeline).to_list(length=None)
+
+
+class BatchWriter:
+    """Coalesce fire-and-forget inserts into insert_many calls.
+
+    Documents are flushed when MAX_BATCH are pending or MAX_WAIT seconds
+    after the first one arrived, whichever comes first.
+    """
+
+    MAX_BATCH = 64
+    MAX_WAIT = 0.025
+
+    def __init__(self):
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self._running = False
+
+    def start(self):
+        """Start the background flush loop (call from app startup)"""
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+        self._running = True
+
+    async def stop(self):
+        """Flush pending documents and stop the flush loop"""
+        if self._task is None:
+            return
+        self._running = False
+        self._queue.put_nowait(None)
+        await self._task
+        self._task = None
+
+    async def enqueue(self, collection_name: str, data: Union[BaseModel, dict]) -> asyncio.Future:
+        """Queue a document for insertion with timestamps; returns immediately.
+
+        The returned future resolves once the document is written, or raises
+        if its insert failed; callers that don't need confirmation can ignore it.
+        Outside start()/stop() the document is inserted directly instead.
+        """
+        if db is None:
+            raise Exception("Database not available. Check DATABASE_URL and DATABASE_NAME environment variables.")
+
+        if isinstance(data, BaseModel):
+            data_dict = data.model_dump()
+        else:
+            data_dict = data.copy()
+
+        data_dict['created_at'] = datetime.now(timezone.utc)
+        data_dict['updated_at'] = datetime.now(timezone.utc)
+
+        written = asyncio.get_running_loop().create_future()
+        if not self._running:
+            await db[collection_name].insert_one(data_dict)
+            written.set_result(None)
+            return written
+        self._queue.put_nowait((collection_name, data_dict, written))
+        return written
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            item = await self._queue.get()
+            if item is None:
+                return
+            batch = [item]
+            stopping = False
+            deadline = loop.time() + self.MAX_WAIT
+            while len(batch) < self.MAX_BATCH:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+            if stopping:
+                return
+
+    async def _flush(self, batch):
+        by_collection = {}
+        for collection_name, doc, written in batch:
+            by_collection.setdefault(collection_name, []).append((doc, written))
+        for collection_name, items in by_collection.items():
+            docs = [doc for doc, _ in items]
+            failed = {}
+            try:
+                await db[collection_name].insert_many(docs, ordered=False)
+            except BulkWriteError as e:
+                # ordered=False: the documents without a write error were inserted.
+                logger.exception("Batched insert into %s partially failed", collection_name)
+                failed = {err["index"]: e for err in e.details.get("writeErrors", [])}
+                if not failed:
+                    failed = dict.fromkeys(range(len(docs)), e)
+            except Exception as e:
+                logger.exception("Batched insert of %d documents into %s failed", len(docs), collection_name)
+                failed = dict.fromkeys(range(len(docs)), e)
+            for i, (_, written) in enumerate(items):
+                if i in failed:
+                    written.set_exception(failed[i])
+                    written.exception()  # already logged; don't warn if nobody awaits it
+                else:
+                    written.set_result(None)
+
+
+batch_writer = BatchWriter()
@@ -1,17 +1,40 @@
 import os
 import io
-import time
+import asyncio
+import hashlib
+import functools
+import logging
+import threading
 from typing import Optional, Literal
 
-import requests
-from fastapi import FastAPI, HTTPException, Query, Request
+import httpx
+from cachetools import TTLCache
+from docx import Document
+import orjson
+import pypdfium2 as pdfium
+import segno
+from bson import ObjectId
+from fastapi import BackgroundTasks, FastAPI, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import StreamingResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, Response
 from pydantic import BaseModel, Field
 
-from database import create_document, get_documents, db
+from database import create_document, get_documents, get_recent_documents, db, batch_writer
 
-app = FastAPI(title="AI VidCV Backend")
+logger = logging.getLogger(__name__)
+
+
+app = FastAPI(title="AI VidCV Backend", default_response_class=ORJSONResponse)
+
+# Shared client so VideoTok calls reuse keep-alive connections instead of
+# paying a fresh TCP+TLS handshake per request.
+_HTTP = httpx.AsyncClient(
+    limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+    http2=True,
+    timeout=10.0,
+)
 
 app.add_middleware(
     CORSMiddleware,
@@ -22,6 +45,65 @@ app.add_middleware(
 )
 
 
+class _JSONGZipMiddleware(GZipMiddleware):
+    """GZip responses except paths that are already compressed (PNG from /api/qr)"""
+
+    SKIP_PATHS = {"/api/qr"}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and scope["path"] in self.SKIP_PATHS:
+            await self.app(scope, receive, send)
+            return
+        await super().__call__(scope, receive, send)
+
+
+app.add_middleware(_JSONGZipMiddleware, minimum_size=512)
+
+
+# Static payloads are serialized once at import; handlers return the bytes as-is.
+_ROOT_JSON = orjson.dumps({"message": "AI VidCV Backend is running"})
+_PLANS_JSON = orjson.dumps({
+    "plans": [
+        {
+            "id": "free",
+            "name": "Free",
+            "price": "$0",
+            "features": [
+                "Up to 20 seconds",
+                "Basic template",
+                "Watermark",
+            ],
+            "upgrade_url": None,
+        },
+        {
+            "id": "premium",
+            "name": "Premium",
+            "price": "$19/mo",
+            "features": [
+                "Advanced styles",
+                "No watermark",
+                "Priority rendering",
+            ],
+            "upgrade_url": "https://www.paypal.com/webapps/billing/plans/subscribe?plan_id=P-6EB31958C8033350MNB72GPQ",
+        },
+        {
+            "id": "pro",
+            "name": "Pro",
+            "price": "$39/mo",
+            "features": [
+                "QR code",
+                "Download enabled",
+                "All Premium features",
+            ],
+            "upgrade_url": "https://www.paypal.com/webapps/billing/plans/subscribe?plan_id=P-3T754046CH3263111NB72RVI",
+        },
+    ]
+})
+# Weak ETags: GZipMiddleware may send the same payload in another content coding.
+_ROOT_ETAG = f'W/"{hashlib.blake2b(_ROOT_JSON, digest_size=8).hexdigest()}"'
+_PLANS_ETAG = f'W/"{hashlib.blake2b(_PLANS_JSON, digest_size=8).hexdigest()}"'
+
+
 class VideoRequest(BaseModel):
     full_name: Optional[str] = Field(None, description="Full name to appear in video")
     target_role: str = Field(..., description="Target job role")
@@ -43,13 +125,32 @@ class VideoRecord(BaseModel):
     downloadable: bool = False
 
 
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    # If-None-Match uses weak comparison: W/ prefixes are ignored.
+    if not if_none_match:
+        return False
+    opaque = etag.removeprefix("W/")
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if tag == "*" or tag.removeprefix("W/") == opaque:
+            return True
+    return False
+
+
+def _static_json(request: Request, content: bytes, etag: str) -> Response:
+    headers = {"ETag": etag}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=content, media_type="application/json", headers=headers)
+
+
 @app.get("/")
-def read_root():
-    return {"message": "AI VidCV Backend is running"}
+def read_root(request: Request):
+    return _static_json(request, _ROOT_JSON, _ROOT_ETAG)
 
 
 @app.get("/test")
-def test_database():
+async def test_database():
     response = {
         "backend": "✅ Running",
         "database": "❌ Not Available",
@@ -66,7 +167,7 @@ def test_database():
             response["database_name"] = db.name if hasattr(db, 'name') else "✅ Connected"
             response["connection_status"] = "Connected"
             try:
-                collections = db.list_collection_names()
+                collections = await db.list_collection_names()
                 response["collections"] = collections[:10]
                 response["database"] = "✅ Connected & Working"
             except Exception as e:
@@ -79,7 +180,39 @@ def test_database():
     return response
 
 
-def _call_videotok_api(prompt: str, duration_sec: int, watermark: bool) -> Optional[dict]:
+@app.on_event("startup")
+async def _start_batch_writer():
+    batch_writer.start()
+
+
+async def _ensure_indexes():
+    # _id is already indexed and walked in reverse for the /api/videos listing;
+    # request_id backs the GET /api/videos/{request_id} lookup.
+    try:
+        await db["videorecord"].create_index("request_id")
+    except Exception:
+        # An optimization only; log it but don't take the app down with the DB.
+        logger.exception("Failed to create videorecord.request_id index")
+
+
+@app.on_event("startup")
+async def _start_index_build():
+    if db is not None:
+        # Kept on app.state so the task isn't garbage collected; startup doesn't wait on it.
+        app.state.index_task = asyncio.create_task(_ensure_indexes())
+
+
+@app.on_event("shutdown")
+async def _stop_batch_writer():
+    await batch_writer.stop()
+
+
+@app.on_event("shutdown")
+async def _close_http_client():
+    await _HTTP.aclose()
+
+
+async def _post_videotok(prompt: str, duration_sec: int, watermark: bool) -> Optional[dict]:
     api_key = os.getenv("VIDEOTOK_API_KEY") or "bfb75f7ee800432fba64205d1c09dc37"
     try:
         headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
@@ -88,7 +221,7 @@ def _call_videotok_api(prompt: str, duration_sec: int, watermark: bool) -> Optio
             "duration": duration_sec,
             "watermark": watermark,
         }
-        resp = requests.post("https://api.videotok.ai/v1/generate", json=payload, headers=headers, timeout=10)
+        resp = await _HTTP.post("https://api.videotok.ai/v1/generate", json=payload, headers=headers)
         if resp.status_code == 200:
             return resp.json()
         return None
@@ -96,149 +229,239 @@ def _call_videotok_api(prompt: str, duration_sec: int, watermark: bool) -> Optio
         return None
 
 
+# Concurrent calls with the same key share the first caller's result.
+_inflight = {}
+
+
+async def _single_flight(key, work):
+    while (fut := _inflight.get(key)) is not None:
+        try:
+            return await asyncio.shield(fut)
+        except asyncio.CancelledError:
+            # Re-raise if this task has a cancel request of its own, even when the
+            # leader was cancelled in the same tick; take over only otherwise.
+            if not fut.cancelled() or asyncio.current_task().cancelling():
+                raise
+    fut = asyncio.get_running_loop().create_future()
+    _inflight[key] = fut
+    try:
+        result = await work()
+    except asyncio.CancelledError:
+        fut.cancel()
+        raise
+    except Exception as e:
+        fut.set_exception(e)
+        fut.exception()  # followers re-raise it; don't warn when there are none
+        raise
+    else:
+        fut.set_result(result)
+        return result
+    finally:
+        if _inflight.get(key) is fut:
+            del _inflight[key]
+
+
+# Identical (prompt, duration, watermark) requests get the same VideoTok result,
+# so successful responses are reused for an hour.
+_VIDEOTOK_CACHE = TTLCache(maxsize=1024, ttl=3600)
+
+
+async def _call_videotok_api(prompt: str, duration_sec: int, watermark: bool) -> Optional[dict]:
+    key = hashlib.blake2b(f"{prompt}|{duration_sec}|{watermark}".encode(), digest_size=16).digest()
+    result = _VIDEOTOK_CACHE.get(key)
+    if result is not None:
+        return result
+
+    async def work():
+        result = await _post_videotok(prompt, duration_sec, watermark)
+        if result is not None:
+            _VIDEOTOK_CACHE[key] = result
+        return result
+
+    return await _single_flight(("videotok", key), work)
+
+
+_PROMPT_HEAD = "Create a short CV video."
+_PROMPT_TAIL = "Include dynamic captions and clean typography."
+
+
 def _build_prompt(req: VideoRequest) -> str:
-    parts = [
-        f"Create a short CV video for {req.full_name}." if req.full_name else "Create a short CV video.",
+    return " ".join(filter(None, (
+        f"Create a short CV video for {req.full_name}." if req.full_name else _PROMPT_HEAD,
         f"Target role: {req.target_role}.",
-    ]
-    if req.style:
-        parts.append(f"Style: {req.style}.")
-    if req.tone:
-        parts.append(f"Tone: {req.tone}.")
-    if req.colors:
-        parts.append(f"Brand colors: {req.colors}.")
-    if req.resume_text:
-        parts.append(f"Highlights from resume: {req.resume_text[:500]}...")
-    parts.append("Include dynamic captions and clean typography.")
-    return " ".join(parts)
-
-
-@app.post("/api/videos")
-def create_video(req: VideoRequest):
-    if req.plan == 'free' and req.duration_sec > 20:
-        raise HTTPException(status_code=400, detail="Free plan allows up to 20 seconds only.")
+        f"Style: {req.style}." if req.style else None,
+        f"Tone: {req.tone}." if req.tone else None,
+        f"Brand colors: {req.colors}." if req.colors else None,
+        f"Highlights from resume: {req.resume_text[:500]}..." if req.resume_text else None,
+        _PROMPT_TAIL,
+    )))
 
+
+async def _run_video_generation(req: VideoRequest, request_id: str):
     watermark = True if req.plan == 'free' else False
     qr_available = True if req.plan == 'pro' else False
     downloadable = True if req.plan == 'pro' else False
 
-    prompt = _build_prompt(req)
+    try:
+        prompt = _build_prompt(req)
 
-    request_id = create_document("videorequest", req.model_dump())
+        api_result = await _call_videotok_api(prompt, req.duration_sec, watermark)
 
-    api_result = _call_videotok_api(prompt, req.duration_sec, watermark)
+        if isinstance(api_result, dict) and api_result.get("video_url"):
+            video_url = api_result["video_url"]
+            thumbnail_url = api_result.get("thumbnail_url")
+            status = "completed"
+        else:
+            video_url = "https://samplelib.com/lib/preview/mp4/sample-5s.mp4" if req.duration_sec <= 6 else "https://samplelib.com/lib/preview/mp4/sample-10s.mp4"
+            thumbnail_url = "https://images.unsplash.com/photo-1525547719571-a2d4ac8945e2?w=600&q=60&auto=format&fit=crop"
+            status = "completed"
+
+        record = VideoRecord(
+            request_id=request_id,
+            status=status,
+            video_url=video_url,
+            thumbnail_url=thumbnail_url,
+            plan=req.plan,
+            qr_available=qr_available,
+            downloadable=downloadable,
+        )
+
+        written = await batch_writer.enqueue("videorecord", record.model_dump())
+        await written
+    except Exception:
+        logger.exception("Video generation failed for request %s", request_id)
+        # Insert directly: GET /api/videos/{request_id} reports "queued" until a record exists.
+        failed = VideoRecord(
+            request_id=request_id,
+            status="failed",
+            plan=req.plan,
+            qr_available=qr_available,
+            downloadable=downloadable,
+        )
+        await create_document("videorecord", failed.model_dump())
 
-    if api_result and api_result.get("video_url"):
-        video_url = api_result["video_url"]
-        thumbnail_url = api_result.get("thumbnail_url")
-        status = "completed"
-    else:
-        video_url = "https://samplelib.com/lib/preview/mp4/sample-5s.mp4" if req.duration_sec <= 6 else "https://samplelib.com/lib/preview/mp4/sample-10s.mp4"
-        thumbnail_url = "https://images.unsplash.com/photo-1525547719571-a2d4ac8945e2?w=600&q=60&auto=format&fit=crop"
-        status = "completed"
-        time.sleep(0.3)
 
-    record = VideoRecord(
-        request_id=request_id,
-        status=status,
-        video_url=video_url,
-        thumbnail_url=thumbnail_url,
-        plan=req.plan,
-        qr_available=qr_available,
-        downloadable=downloadable,
-    )
+@app.post("/api/videos", status_code=202)
+async def create_video(req: VideoRequest, background_tasks: BackgroundTasks):
+    if req.plan == 'free' and req.duration_sec > 20:
+        raise HTTPException(status_code=400, detail="Free plan allows up to 20 seconds only.")
 
-    create_document("videorecord", record.model_dump())
+    request_id = await create_document("videorequest", req.model_dump())
 
-    return record.model_dump()
+    # Generation runs after the response is sent; clients poll GET /api/videos/{request_id}.
+    background_tasks.add_task(_run_video_generation, req, request_id)
+
+    return {"request_id": request_id, "status": "queued"}
 
 
 @app.get("/api/videos")
-def list_recent_videos(limit: int = 10):
+async def list_recent_videos(limit: int = Query(10, ge=1, le=100)):
     try:
-        docs = get_documents("videorecord", limit=limit)
-        for d in docs:
-            if "_id" in d:
-                d["_id"] = str(d["_id"])
+        docs = await get_recent_documents("videorecord", VideoRecord.model_fields, limit=limit)
         return {"items": docs}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/api/videos/{request_id}")
+async def get_video(request_id: str):
+    if not ObjectId.is_valid(request_id):
+        raise HTTPException(status_code=404, detail="Video request not found.")
+    try:
+        docs = await get_documents("videorecord", {"request_id": request_id}, limit=1)
+        if docs:
+            doc = docs[0]
+            doc["_id"] = str(doc["_id"])
+            return doc
+        pending = await get_documents("videorequest", {"_id": ObjectId(request_id)}, limit=1)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if not pending:
+        raise HTTPException(status_code=404, detail="Video request not found.")
+    return {"request_id": request_id, "status": "queued"}
+
+
+@functools.lru_cache(maxsize=2048)
+def _qr_png(url: str) -> bytes:
+    qr = segno.make_qr(url, error="h")
+    buf = io.BytesIO()
+    qr.save(buf, kind="png", scale=10, border=2)
+    return buf.getvalue()
+
+
 @app.get("/api/qr")
-def generate_qr(url: str = Query(..., description="URL to encode as QR")):
+async def generate_qr(url: str = Query(..., description="URL to encode as QR")):
     try:
-        import qrcode
-        from PIL import Image
-
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_H,
-            box_size=10,
-            border=2,
-        )
-        qr.add_data(url)
-        qr.make(fit=True)
-        img = qr.make_image(fill_color="black", back_color="white").convert("RGB")
-
-        buf = io.BytesIO()
-        img.save(buf, format="PNG")
-        buf.seek(0)
-        return StreamingResponse(buf, media_type="image/png")
+        png = await _single_flight(("qr", url), lambda: run_in_threadpool(_qr_png, url))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"QR generation failed: {str(e)}")
+    return Response(png, media_type="image/png", headers={"Cache-Control": "public, max-age=86400"})
 
 
 @app.get("/api/plans")
-def get_plans():
-    return {
-        "plans": [
-            {
-                "id": "free",
-                "name": "Free",
-                "price": "$0",
-                "features": [
-                    "Up to 20 seconds",
-                    "Basic template",
-                    "Watermark",
-                ],
-                "upgrade_url": None,
-            },
-            {
-                "id": "premium",
-                "name": "Premium",
-                "price": "$19/mo",
-                "features": [
-                    "Advanced styles",
-                    "No watermark",
-                    "Priority rendering",
-                ],
-                "upgrade_url": "https://www.paypal.com/webapps/billing/plans/subscribe?plan_id=P-6EB31958C8033350MNB72GPQ",
-            },
-            {
-                "id": "pro",
-                "name": "Pro",
-                "price": "$39/mo",
-                "features": [
-                    "QR code",
-                    "Download enabled",
-                    "All Premium features",
-                ],
-                "upgrade_url": "https://www.paypal.com/webapps/billing/plans/subscribe?plan_id=P-3T754046CH3263111NB72RVI",
-            },
-        ]
-    }
+def get_plans(request: Request):
+    return _static_json(request, _PLANS_JSON, _PLANS_ETAG)
 
 
 # -------- Resume upload (raw bytes, no multipart dependency) --------
 
+MAX_RESUME_BYTES = 5 * 1024 * 1024
+
+# Exact MIME lookup first; the substring scan below only handles unusual types.
+_MIME_EXT = {
+    "application/pdf": ".pdf",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": ".docx",
+    "application/msword": ".doc",
+}
+
+# Parsing is synchronous and CPU-bound, so these run in the threadpool.
+
+# PDFium is not thread-safe, even across separate documents, so PDF parses
+# are serialized while DOCX parses still run concurrently in the threadpool.
+_PDFIUM_LOCK = threading.Lock()
+
+
+def _parse_pdf(data: bytes) -> str:
+    with _PDFIUM_LOCK:
+        pdf = pdfium.PdfDocument(data)
+        try:
+            texts = []
+            for page in pdf:
+                textpage = page.get_textpage()
+                texts.append(textpage.get_text_range())
+                textpage.close()
+                page.close()
+            return "\n".join(texts).strip()
+        finally:
+            pdf.close()
+
+
+def _parse_docx(data: bytes) -> str:
+    doc = Document(io.BytesIO(data))
+    paras = [p.text for p in doc.paragraphs]
+    return "\n".join([p for p in paras if p]).strip()
+
+
 @app.post("/api/upload-resume")
 async def upload_resume(request: Request, filename: Optional[str] = Query(None)):
     content_type = request.headers.get("content-type", "application/octet-stream").lower()
-    data = await request.body()
+
+    # Reject oversized uploads before buffering them; the stream check also
+    # covers chunked bodies that don't send Content-Length.
+    content_length = request.headers.get("content-length", "")
+    if content_length.isdigit() and int(content_length) > MAX_RESUME_BYTES:
+        raise HTTPException(status_code=413, detail="Resume too large (max 5MB)")
+    body = bytearray()
+    async for chunk in request.stream():
+        body.extend(chunk)
+        if len(body) > MAX_RESUME_BYTES:
+            raise HTTPException(status_code=413, detail="Resume too large (max 5MB)")
+    data = bytes(body)
 
     # Determine file type from filename or content-type
     ext = (os.path.splitext(filename)[1].lower() if filename else "") if filename else ""
+    if not ext:
+        ext = _MIME_EXT.get(content_type.split(";", 1)[0].strip(), "")
     if not ext:
         if "pdf" in content_type:
             ext = ".pdf"
@@ -249,18 +472,12 @@ async def upload_resume(request: Request, filename: Optional[str] = Query(None))
 
     if ext == ".pdf":
         try:
-            from PyPDF2 import PdfReader
-            reader = PdfReader(io.BytesIO(data))
-            texts = [(page.extract_text() or "") for page in reader.pages]
-            text = "\n".join(texts).strip()
+            text = await run_in_threadpool(_parse_pdf, data)
         except Exception as e:
             raise HTTPException(status_code=400, detail=f"Failed to read PDF: {str(e)[:120]}")
     elif ext == ".docx":
         try:
-            from docx import Document
-            doc = Document(io.BytesIO(data))
-            paras = [p.text for p in doc.paragraphs]
-            text = "\n".join([p for p in paras if p]).strip()
+            text = await run_in_threadpool(_parse_docx, data)
         except Exception as e:
             raise HTTPException(status_code=400, detail=f"Failed to read DOCX: {str(e)[:120]}")
     elif ext == ".doc":